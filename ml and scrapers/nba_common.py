@@ -0,0 +1,278 @@
+"""
+NBA Updater Common Helpers
+Vectorized transforms and CSV/Parquet I/O shared by the regular season and playoff updaters
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from functools import lru_cache
+import os
+import re
+import shutil
+
+# Cache NBA.com responses on disk so repeated runs skip the network.
+# Set NBA_API_CACHE=0 to disable, NBA_API_CACHE_EXPIRE to change expiry (seconds).
+# Import this module before nba_api so its requests go through the cache.
+if os.environ.get('NBA_API_CACHE', '1') != '0':
+    try:
+        import requests_cache
+        requests_cache.install_cache(
+            'nba_cache',
+            backend='sqlite',
+            expire_after=int(os.environ.get('NBA_API_CACHE_EXPIRE', 3600))
+        )
+    except ImportError:
+        pass
+
+try:
+    import pyarrow
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
+
+try:
+    from numba import vectorize, int16, int32, int64, float64
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+_TEAM_CODE_RE = re.compile(r'\b[A-Z]{3}\b')
+
+# Column layout of the game log files
+GAME_LOG_COLUMNS = ['Player', 'Tm', 'Opp', 'Res', 'MP', 'FG', 'FGA', 'FG%', '3P', '3PA', '3P%', 'FT', 'FTA', 'FT%',
+                    'ORB', 'DRB', 'TRB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS', 'GmSc', 'Data']
+
+# NBA API game log columns and their names in the game log files
+API_COLUMN_MAPPING = {
+    'PLAYER_NAME': 'Player',
+    'TEAM_ABBREVIATION': 'Tm',
+    'Opp': 'Opp',  # Extracted from MATCHUP
+    'WL': 'Res',
+    'MIN': 'MP',
+    'FGM': 'FG',
+    'FGA': 'FGA',
+    'FG_PCT': 'FG%',
+    'FG3M': '3P',
+    'FG3A': '3PA',
+    'FG3_PCT': '3P%',
+    'FTM': 'FT',
+    'FTA': 'FTA',
+    'FT_PCT': 'FT%',
+    'OREB': 'ORB',
+    'DREB': 'DRB',
+    'REB': 'TRB',
+    'AST': 'AST',
+    'STL': 'STL',
+    'BLK': 'BLK',
+    'TOV': 'TOV',
+    'PF': 'PF',
+    'PTS': 'PTS',
+    'GAME_DATE': 'Data'
+}
+
+STAT_COLUMNS = ['FG', 'FGA', '3P', '3PA', 'FT', 'FTA', 'ORB', 'DRB', 'TRB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS']
+PCT_COLUMNS = ['FG%', '3P%', 'FT%']
+
+GMSC_COLUMNS = ['PTS', 'FG', 'FGA', 'FTA', 'FT', 'ORB', 'DRB', 'STL', 'AST', 'BLK', 'PF', 'TOV']
+
+def _game_score(pts, fg, fga, fta, ft, orb, drb, stl, ast, blk, pf, tov):
+    return (pts + 0.4 * fg - 0.7 * fga - 0.4 * (fta - ft) + 0.7 * orb + 0.3 * drb +
+            stl + 0.7 * ast + 0.7 * blk - 0.4 * pf - tov)
+
+@lru_cache(maxsize=1)
+def _game_score_kernel():
+    """Compile the Game Score ufunc on first use, reusing the on-disk cache between runs"""
+    # Accept the same integer/float stat columns the pandas fallback does
+    signatures = [float64(*[t] * len(GMSC_COLUMNS)) for t in (int16, int32, int64, float64)]
+    return vectorize(signatures, nopython=True, cache=True)(_game_score)
+
+def _split_opponents_polars(matchup, team_abbrev):
+    """Split MATCHUP into opponents with a Polars lazy query (null where it doesn't split)"""
+    frame = pl.from_pandas(pd.DataFrame({'MATCHUP': matchup, 'TEAM': team_abbrev}))
+
+    away = pl.col('MATCHUP').str.split_exact(' @ ', 1)
+    home = pl.col('MATCHUP').str.split_exact(' vs. ', 1)
+    sides = pl.when(away.struct.field('field_1').is_not_null()).then(away).otherwise(home)
+    first = pl.col('_sides').struct.field('field_0').str.strip_chars()
+    second = pl.col('_sides').struct.field('field_1').str.strip_chars()
+
+    opp = (
+        frame.lazy()
+        .with_columns(sides.alias('_sides'))
+        .select(
+            pl.when(second.is_not_null())
+            .then(pl.when(first == pl.col('TEAM')).then(second).otherwise(first))
+            .alias('Opp')
+        )
+        .collect()
+    )
+    return pd.Series(opp['Opp'].to_numpy(), index=matchup.index, dtype=object)
+
+def extract_opponents_vectorized(df):
+    """
+    Extract opponents from the MATCHUP and TEAM_ABBREVIATION columns in one vectorized pass
+    Examples: 'LAL @ BOS', 'GSW vs. LAC'
+    """
+    matchup = df['MATCHUP']
+    team_abbrev = df['TEAM_ABBREVIATION']
+
+    # Whichever side of the matchup is not the player's team is the opponent
+    if POLARS_AVAILABLE and PYARROW_AVAILABLE:
+        opp = _split_opponents_polars(matchup, team_abbrev)
+    else:
+        parts = matchup.str.split(r' @ | vs\. ', n=1, expand=True).reindex(columns=[0, 1])
+        first = parts[0].str.strip()
+        second = parts[1].str.strip()
+        opp = pd.Series(np.where(first == team_abbrev, second, first), index=matchup.index)
+        opp = opp.where(second.notna())
+
+    # Fallback: first 3-letter team code that isn't the player's team
+    fallback = opp.isna() & matchup.notna()
+    if fallback.any():
+        codes = matchup[fallback].str.findall(_TEAM_CODE_RE)
+        opp[fallback] = [
+            next((code for code in found if code != team), 'UNK')
+            for found, team in zip(codes, team_abbrev[fallback])
+        ]
+
+    return opp.fillna('UNK')
+
+def add_game_score(df):
+    """Add the GmSc column, fused into one pass with Numba when available"""
+    if NUMBA_AVAILABLE:
+        gmsc = _game_score_kernel()(*(df[c].to_numpy() for c in GMSC_COLUMNS))
+        df['GmSc'] = np.round(gmsc, 1)
+        return df
+
+    df['GmSc'] = (
+        df['PTS'] +
+        0.4 * df['FG'] -
+        0.7 * df['FGA'] -
+        0.4 * (df['FTA'] - df['FT']) +
+        0.7 * df['ORB'] +
+        0.3 * df['DRB'] +
+        df['STL'] +
+        0.7 * df['AST'] +
+        0.7 * df['BLK'] -
+        0.4 * df['PF'] -
+        df['TOV']
+    ).round(1)
+    return df
+
+def convert_minutes_vectorized(minutes):
+    """Convert a minutes column from MM:SS format (or numbers) to decimal"""
+    if pd.api.types.is_numeric_dtype(minutes):
+        return minutes.fillna(0).astype(float).round(2)
+
+    mp = minutes.astype('string').fillna('0:0')
+    parts = mp.str.split(':', n=1, expand=True).reindex(columns=[0, 1])
+    mins = pd.to_numeric(parts[0], errors='coerce').fillna(0)
+    secs = pd.to_numeric(parts[1], errors='coerce').fillna(0)
+    return (mins + secs / 60).round(2)
+
+def to_game_log(df):
+    """Map an NBA API game log (with an Opp column) to the game log format, typed and with GmSc"""
+    present = {k: v for k, v in API_COLUMN_MAPPING.items() if k in df.columns}
+    result_df = df[list(present)].rename(columns=present)
+
+    if 'Data' in result_df.columns:
+        result_df['Data'] = pd.to_datetime(result_df['Data'])
+
+    # Convert minutes
+    if 'MP' in result_df.columns:
+        result_df['MP'] = convert_minutes_vectorized(result_df['MP'])
+
+    # Fill NaN values and convert data types
+    num_present = [c for c in STAT_COLUMNS if c in result_df.columns]
+    result_df[num_present] = result_df[num_present].apply(pd.to_numeric, errors='coerce').fillna(0).astype('int16')
+
+    # Percentages stay float64 so they match the history they're written alongside
+    pct_present = [c for c in PCT_COLUMNS if c in result_df.columns]
+    result_df[pct_present] = result_df[pct_present].apply(pd.to_numeric, errors='coerce').fillna(0.0).astype('float64')
+
+    # Low-cardinality labels are much smaller as categoricals
+    for col in ('Player', 'Tm', 'Opp', 'Res'):
+        if col in result_df.columns:
+            result_df[col] = result_df[col].astype('category')
+
+    # Calculate Game Score
+    return add_game_score(result_df)
+
+@lru_cache(maxsize=1)
+def get_current_season():
+    """Get current NBA season (computed once per run)"""
+    today = datetime.now()
+    if today.month >= 10:
+        season_start_year = today.year
+    else:
+        season_start_year = today.year - 1
+    return f"{season_start_year}-{str(season_start_year + 1)[2:]}"
+
+def load_game_log(path):
+    """Load game log data from a CSV or Parquet file"""
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+        # The Data partition comes back as a categorical of strings, moved to the last column
+        df['Data'] = pd.to_datetime(df['Data'].astype(str))
+        ordered = [c for c in GAME_LOG_COLUMNS if c in df.columns]
+        return df[ordered + [c for c in df.columns if c not in ordered]]
+    if PYARROW_AVAILABLE:
+        return pd.read_csv(path, engine='pyarrow')
+    return pd.read_csv(path)
+
+def save_game_log(df, path, append=False):
+    """Save game log data, as Parquet when the path ends in .parquet"""
+    if path.endswith('.parquet'):
+        # Parquet logs are datasets partitioned by game date: appends add files,
+        # full saves replace whatever dataset is already there
+        if not append and os.path.isdir(path):
+            shutil.rmtree(path)
+        elif not append and os.path.exists(path):
+            os.remove(path)
+        df = df.assign(Data=pd.to_datetime(df['Data']).dt.strftime('%Y-%m-%d'))
+        df.to_parquet(path, partition_cols=['Data'], compression='snappy', index=False)
+    else:
+        df.to_csv(path, index=False, lineterminator='\n')
+
+def _game_keys(df):
+    """Build a single Player|Data|Tm key per game as a categorical"""
+    return (df['Player'].astype('string') + '|' +
+            df['Data'].astype('string') + '|' +
+            df['Tm'].astype('string')).astype('category')
+
+def select_new_games(new_data, existing_df):
+    """Drop repeated games from new_data and games already present in existing_df"""
+    key = _game_keys(new_data)
+    is_new = ~key.duplicated(keep='last') & ~key.isin(_game_keys(existing_df))
+    return new_data[is_new]
+
+def write_new_games(existing_df, new_rows, csv_path, output_path):
+    """Append new rows to csv_path in place, or write the full log when output_path differs"""
+    if output_path != csv_path:
+        save_game_log(pd.concat([existing_df, new_rows], ignore_index=True), output_path)
+    elif output_path.endswith('.parquet'):
+        save_game_log(new_rows, output_path, append=True)
+    else:
+        new_rows.to_csv(output_path, mode='a', header=False, index=False,
+                        columns=list(existing_df.columns), lineterminator='\n')
+
+def align_columns(df, expected_columns):
+    """Add missing columns with type-appropriate defaults in one assign, then reorder"""
+    missing = [c for c in expected_columns if c not in df.columns]
+    str_cols = [c for c in missing if c in ('Opp', 'Player', 'Tm', 'Res', 'Data')]
+    float_cols = [c for c in missing if c in ('FG%', '3P%', 'FT%', 'GmSc', 'MP')]
+    int_cols = [c for c in missing if c not in str_cols and c not in float_cols]
+
+    df = df.assign(
+        **{c: 'Unknown' for c in str_cols},
+        **{c: 0.0 for c in float_cols},
+        **{c: 0 for c in int_cols}
+    )
+    return df[expected_columns]
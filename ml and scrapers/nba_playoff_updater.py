@@ -5,109 +5,39 @@ Fetches Play-In, Playoff, and Finals data to add to your existing CSV
 """
 
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import time
-import re
-import warnings
-warnings.filterwarnings('ignore')
+import requests
+from requests.adapters import HTTPAdapter
+
+from nba_common import (
+    extract_opponents_vectorized,
+    to_game_log,
+    get_current_season,
+    load_game_log,
+    align_columns,
+    select_new_games,
+    write_new_games
+)
 
 # Try importing required modules
 try:
     from nba_api.stats.endpoints import leaguegamelog
+    from nba_api.stats.library.http import NBAStatsHTTP
     NBA_API_AVAILABLE = True
     print("✅ NBA API available")
 except ImportError:
     NBA_API_AVAILABLE = False
     print("❌ NBA API not available. Install with: pip install nba-api")
 
-def extract_opponent_from_matchup(matchup, team_abbrev):
-    """Extract opponent from MATCHUP string"""
-    if pd.isna(matchup) or not matchup:
-        return 'UNK'
+def configure_nba_session():
+    """Give nba_api a fresh keep-alive session with a capped, retrying connection pool"""
+    if not NBA_API_AVAILABLE or not hasattr(NBAStatsHTTP, 'set_session'):
+        return
 
-    try:
-        matchup = matchup.strip()
-
-        if ' @ ' in matchup:
-            teams = matchup.split(' @ ')
-            away_team = teams[0].strip()
-            home_team = teams[1].strip()
-
-            if away_team == team_abbrev:
-                return home_team
-            elif home_team == team_abbrev:
-                return away_team
-
-        elif ' vs. ' in matchup:
-            teams = matchup.split(' vs. ')
-            home_team = teams[0].strip()
-            away_team = teams[1].strip()
-
-            if home_team == team_abbrev:
-                return away_team
-            elif away_team == team_abbrev:
-                return home_team
-
-        # Fallback
-        team_codes = re.findall(r'\b[A-Z]{3}\b', matchup)
-        for code in team_codes:
-            if code != team_abbrev:
-                return code
-
-        return 'UNK'
-
-    except Exception as e:
-        print(f"Error parsing matchup '{matchup}': {e}")
-        return 'UNK'
-
-def calculate_game_score(row):
-    """Calculate Game Score"""
-    try:
-        return (
-            row['PTS'] + 
-            0.4 * row['FG'] - 
-            0.7 * row['FGA'] - 
-            0.4 * (row['FTA'] - row['FT']) + 
-            0.7 * row['ORB'] + 
-            0.3 * row['DRB'] + 
-            row['STL'] + 
-            0.7 * row['AST'] + 
-            0.7 * row['BLK'] - 
-            0.4 * row['PF'] - 
-            row['TOV']
-        )
-    except:
-        return 0.0
-
-def convert_minutes(minutes_str):
-    """Convert minutes from MM:SS to decimal"""
-    if pd.isna(minutes_str) or minutes_str == '':
-        return 0.0
-
-    try:
-        if isinstance(minutes_str, (int, float)):
-            return float(minutes_str)
-
-        minutes_str = str(minutes_str)
-        if ':' in minutes_str:
-            parts = minutes_str.split(':')
-            minutes = int(parts[0])
-            seconds = int(parts[1])
-            return round(minutes + seconds/60, 2)
-        else:
-            return round(float(minutes_str), 2)
-    except:
-        return 0.0
-
-def get_current_season():
-    """Get current NBA season"""
-    today = datetime.now()
-    if today.month >= 10:
-        season_start_year = today.year
-    else:
-        season_start_year = today.year - 1
-    return f"{season_start_year}-{str(season_start_year + 1)[2:]}"
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=3))
+    NBAStatsHTTP.set_session(session)
 
 def get_nba_playoff_data(season_type='Playoffs', start_date=None):
     """
@@ -120,115 +50,40 @@ def get_nba_playoff_data(season_type='Playoffs', start_date=None):
         print("❌ NBA API not available")
         return pd.DataFrame()
 
-    print(f"🏆 Fetching {season_type} data...")
-
+    # Runs in worker threads, so progress is reported by the caller
     try:
         current_season = get_current_season()
-        print(f"📅 Season: {current_season}")
 
-        # Get player game logs for playoffs
-        print(f"⏳ Requesting {season_type} data from NBA.com...")
+        # Get player game logs for playoffs, letting NBA.com filter by date (MM/DD/YYYY)
+        date_from = pd.to_datetime(start_date).strftime('%m/%d/%Y') if start_date else ''
+
         gamelog = leaguegamelog.LeagueGameLog(
             season=current_season,
             season_type_all_star=season_type,
-            player_or_team_abbreviation='P'
+            player_or_team_abbreviation='P',
+            date_from_nullable=date_from
         )
 
         time.sleep(2)  # Rate limiting
         df = gamelog.get_data_frames()[0]
 
-        print(f"📊 Retrieved {len(df)} {season_type.lower()} game records")
-
         if df.empty:
-            print(f"❌ No {season_type.lower()} data found")
             return pd.DataFrame()
 
-        # Filter by date if specified
-        if start_date:
-            df['GAME_DATE'] = pd.to_datetime(df['GAME_DATE'])
-            start_dt = pd.to_datetime(start_date)
-            df = df[df['GAME_DATE'] >= start_dt]
-            print(f"🗓️ Filtered to {len(df)} records from {start_date} onwards")
-        else:
-            df['GAME_DATE'] = pd.to_datetime(df['GAME_DATE'])
-
         # Extract opponents
         if 'MATCHUP' in df.columns:
-            print("✅ Extracting opponents...")
-            df = df.copy()
-            df['Opp'] = df.apply(
-                lambda row: extract_opponent_from_matchup(row['MATCHUP'], row['TEAM_ABBREVIATION']), 
-                axis=1
-            )
+            df['Opp'] = extract_opponents_vectorized(df)
         else:
             df['Opp'] = 'UNK'
 
-        # Map columns to your CSV format
-        result_df = pd.DataFrame()
-
-        column_mapping = {
-            'PLAYER_NAME': 'Player',
-            'TEAM_ABBREVIATION': 'Tm',
-            'Opp': 'Opp',
-            'WL': 'Res',
-            'MIN': 'MP',
-            'FGM': 'FG',
-            'FGA': 'FGA',
-            'FG_PCT': 'FG%',
-            'FG3M': '3P',
-            'FG3A': '3PA',
-            'FG3_PCT': '3P%',
-            'FTM': 'FT',
-            'FTA': 'FTA',
-            'FT_PCT': 'FT%',
-            'OREB': 'ORB',
-            'DREB': 'DRB',
-            'REB': 'TRB',
-            'AST': 'AST',
-            'STL': 'STL',
-            'BLK': 'BLK',
-            'TOV': 'TOV',
-            'PF': 'PF',
-            'PTS': 'PTS',
-            'GAME_DATE': 'Data'
-        }
-
-        # Map available columns
-        for old_col, new_col in column_mapping.items():
-            if old_col in df.columns:
-                result_df[new_col] = df[old_col]
-
-        # Convert and clean data
-        result_df['Data'] = result_df['Data'].dt.strftime('%Y-%m-%d')
-
-        if 'MP' in result_df.columns:
-            result_df['MP'] = result_df['MP'].apply(convert_minutes)
-
-        # Convert data types
-        numeric_cols = ['FG', 'FGA', '3P', '3PA', 'FT', 'FTA', 'ORB', 'DRB', 'TRB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS']
-        for col in numeric_cols:
-            if col in result_df.columns:
-                result_df[col] = pd.to_numeric(result_df[col], errors='coerce').fillna(0).astype(int)
-
-        pct_cols = ['FG%', '3P%', 'FT%']  
-        for col in pct_cols:
-            if col in result_df.columns:
-                result_df[col] = pd.to_numeric(result_df[col], errors='coerce').fillna(0).astype(float)
-
-        # Calculate Game Score
-        result_df['GmSc'] = result_df.apply(calculate_game_score, axis=1).round(1)
-
-        print(f"✅ Processed {len(result_df)} {season_type.lower()} records")
-
-        # Summary
-        if not result_df.empty:
-            print(f"🎯 Date range: {result_df['Data'].min()} to {result_df['Data'].max()}")
-            print(f"📊 Players: {result_df['Player'].nunique()}, Teams: {result_df['Tm'].nunique()}")
-
-        return result_df
+        # Map to your CSV format, typed and with Game Score
+        return to_game_log(df)
 
+    except requests.exceptions.RequestException:
+        # Let the caller reset the session and retry network failures
+        raise
     except Exception as e:
-        print(f"❌ Error: {e}")
+        print(f"❌ Error fetching {season_type} data: {e}")
         return pd.DataFrame()
 
 def update_csv_with_playoff_data(csv_path='nba_game_player_data.csv', output_path=None, season_types=None):
@@ -239,9 +94,12 @@ def update_csv_with_playoff_data(csv_path='nba_game_player_data.csv', output_pat
     print("🏆 NBA Playoff Data Updater")
     print("=" * 40)
 
+    # Share one pooled session across the season type requests
+    configure_nba_session()
+
     # Load existing data
     try:
-        existing_df = pd.read_csv(csv_path)
+        existing_df = load_game_log(csv_path)
         print(f"📁 Loaded existing data: {len(existing_df)} records")
 
         existing_df['Data'] = pd.to_datetime(existing_df['Data'])
@@ -254,16 +112,40 @@ def update_csv_with_playoff_data(csv_path='nba_game_player_data.csv', output_pat
         print(f"❌ Error: {e}")
         return False
 
-    # Collect all playoff data
-    all_playoff_data = []
+    # Collect all playoff data, fetching each season type concurrently
+    print(f"\n📅 Season: {get_current_season()}")
+    print(f"🔍 Fetching {', '.join(season_types)} data from NBA.com...")
+    with ThreadPoolExecutor(max_workers=max(1, len(season_types))) as executor:
+        futures = [executor.submit(get_nba_playoff_data, season_type) for season_type in season_types]
+
+    results = []
+    failed = []
+    for season_type, future in zip(season_types, futures):
+        try:
+            results.append(future.result())
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ {season_type} request failed: {e}")
+            results.append(pd.DataFrame())
+            failed.append(season_type)
+
+    # Retry failed season types once on a fresh session
+    if failed:
+        print(f"🔄 Resetting session and retrying {', '.join(failed)}...")
+        configure_nba_session()
+        for season_type in failed:
+            try:
+                results[season_types.index(season_type)] = get_nba_playoff_data(season_type)
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Error fetching {season_type} data: {e}")
 
-    for season_type in season_types:
-        print(f"\n🔍 Fetching {season_type} data...")
-        playoff_data = get_nba_playoff_data(season_type)
+    all_playoff_data = []
 
+    for season_type, playoff_data in zip(season_types, results):
         if not playoff_data.empty:
             all_playoff_data.append(playoff_data)
             print(f"✅ Got {len(playoff_data)} {season_type.lower()} records")
+            print(f"   🎯 Date range: {playoff_data['Data'].min().strftime('%Y-%m-%d')} to {playoff_data['Data'].max().strftime('%Y-%m-%d')}")
+            print(f"   📊 Players: {playoff_data['Player'].nunique()}, Teams: {playoff_data['Tm'].nunique()}")
         else:
             print(f"⚠️ No {season_type.lower()} data found")
 
@@ -271,43 +153,31 @@ def update_csv_with_playoff_data(csv_path='nba_game_player_data.csv', output_pat
         print("❌ No playoff data found")
         return False
 
-    # Combine all playoff data
-    combined_playoff_df = pd.concat(all_playoff_data, ignore_index=True)
-    print(f"\n📊 Total new playoff records: {len(combined_playoff_df)}")
+    print(f"\n📊 Total new playoff records: {sum(len(df) for df in all_playoff_data)}")
 
-    # Ensure column consistency
+    # Ensure column consistency on each frame so they're combined in one concat
     expected_columns = list(existing_df.columns)
 
-    for col in expected_columns:
-        if col not in combined_playoff_df.columns:
-            if col in ['FG%', '3P%', 'FT%', 'GmSc', 'MP']:
-                combined_playoff_df[col] = 0.0
-            elif col in ['Opp', 'Player', 'Tm', 'Res', 'Data']:
-                combined_playoff_df[col] = 'Unknown'
-            else:
-                combined_playoff_df[col] = 0
-
-    # Reorder columns and combine
-    combined_playoff_df = combined_playoff_df[expected_columns]
-    existing_df['Data'] = existing_df['Data'].dt.strftime('%Y-%m-%d')
+    all_playoff_data = [align_columns(df, expected_columns) for df in all_playoff_data]
+    combined_playoff_df = pd.concat(all_playoff_data, ignore_index=True)
 
-    final_df = pd.concat([existing_df, combined_playoff_df], ignore_index=True)
-    final_df = final_df.drop_duplicates(subset=['Player', 'Data', 'Tm'], keep='last')
+    # Only games that aren't already on disk need writing
+    new_rows = select_new_games(combined_playoff_df, existing_df)
 
-    print(f"📈 Final dataset: {len(final_df)} total records")
-    print(f"➕ Added {len(final_df) - len(existing_df)} new playoff records")
+    print(f"📈 Final dataset: {len(existing_df) + len(new_rows)} total records")
+    print(f"➕ Added {len(new_rows)} new playoff records")
 
     # Save
     if output_path is None:
         output_path = csv_path
 
     try:
-        final_df.to_csv(output_path, index=False)
+        write_new_games(existing_df, new_rows, csv_path, output_path)
         print(f"✅ Updated data saved to: {output_path}")
 
         if len(combined_playoff_df) > 0:
             print(f"\n🏆 Playoff Data Summary:")
-            print(f"   Date range: {combined_playoff_df['Data'].min()} to {combined_playoff_df['Data'].max()}")
+            print(f"   Date range: {combined_playoff_df['Data'].min().strftime('%Y-%m-%d')} to {combined_playoff_df['Data'].max().strftime('%Y-%m-%d')}")
             print(f"   Players: {combined_playoff_df['Player'].nunique()}")
             print(f"   Teams: {combined_playoff_df['Tm'].nunique()}")
 
@@ -0,0 +1,134 @@
+import os
+
+import pytest
+
+os.environ.setdefault('NBA_API_CACHE', '0')
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('pyarrow')
+
+import nba_common
+
+SAMPLE_CSV = os.path.join(os.path.dirname(__file__), 'nba_game_player_data.csv')
+
+
+def _sample_log(start, stop):
+    log = pd.read_csv(SAMPLE_CSV).iloc[start:stop].reset_index(drop=True)
+    log['Data'] = pd.to_datetime(log['Data'])
+    return log
+
+
+def _api_log(start, stop):
+    """Rebuild the NBA API game log the sample rows were made from"""
+    log = pd.read_csv(SAMPLE_CSV).iloc[start:stop].reset_index(drop=True)
+    return pd.DataFrame({
+        'PLAYER_NAME': log['Player'], 'TEAM_ABBREVIATION': log['Tm'],
+        'MATCHUP': log['Tm'] + ' @ ' + log['Opp'], 'WL': log['Res'], 'MIN': log['MP'],
+        'FGM': log['FG'], 'FGA': log['FGA'], 'FG_PCT': log['FG%'],
+        'FG3M': log['3P'], 'FG3A': log['3PA'], 'FG3_PCT': log['3P%'],
+        'FTM': log['FT'], 'FTA': log['FTA'], 'FT_PCT': log['FT%'],
+        'OREB': log['ORB'], 'DREB': log['DRB'], 'REB': log['TRB'], 'AST': log['AST'],
+        'STL': log['STL'], 'BLK': log['BLK'], 'TOV': log['TOV'], 'PF': log['PF'],
+        'PTS': log['PTS'], 'GAME_DATE': log['Data'],
+    })
+
+
+def _sorted(df):
+    return df.sort_values(['Data', 'Player', 'Tm']).reset_index(drop=True)
+
+
+def test_parquet_round_trip(tmp_path):
+    log = _sample_log(0, 40)
+    path = str(tmp_path / 'log.parquet')
+
+    nba_common.save_game_log(log, path)
+    loaded = nba_common.load_game_log(path)
+
+    assert list(loaded.columns) == list(log.columns)
+    assert pd.api.types.is_datetime64_any_dtype(loaded['Data'])
+    assert loaded['Data'].max() == log['Data'].max()
+    pd.testing.assert_frame_equal(_sorted(loaded), _sorted(log), check_dtype=False)
+
+
+def test_parquet_in_place_update_appends_new_games(tmp_path):
+    existing = _sample_log(0, 20)
+    new_rows = _sample_log(20, 40)
+    path = str(tmp_path / 'log.parquet')
+
+    nba_common.save_game_log(existing, path)
+    nba_common.write_new_games(existing, new_rows, path, path)
+    loaded = nba_common.load_game_log(path)
+
+    assert len(loaded) == 40
+    pd.testing.assert_frame_equal(
+        _sorted(loaded), _sorted(pd.concat([existing, new_rows])), check_dtype=False
+    )
+
+
+def test_parquet_full_save_replaces_existing_dataset(tmp_path):
+    existing = _sample_log(0, 20)
+    new_rows = _sample_log(20, 40)
+    csv_path = str(tmp_path / 'log.csv')
+    output_path = str(tmp_path / 'log.parquet')
+
+    for _ in range(2):
+        nba_common.write_new_games(existing, new_rows, csv_path, output_path)
+
+    assert len(nba_common.load_game_log(output_path)) == 40
+
+
+def test_csv_full_save_matches_source_text(tmp_path):
+    existing = _sample_log(0, 20)
+    api_log = _api_log(20, 40)
+    api_log['Opp'] = nba_common.extract_opponents_vectorized(api_log)
+    new_rows = nba_common.align_columns(nba_common.to_game_log(api_log), list(existing.columns))
+    output_path = str(tmp_path / 'out.csv')
+
+    nba_common.write_new_games(existing, new_rows, str(tmp_path / 'log.csv'), output_path)
+
+    with open(SAMPLE_CSV) as f:
+        expected = [next(f) for _ in range(41)]
+    with open(output_path) as f:
+        assert f.readlines() == expected
+
+
+MATCHUPS = pd.DataFrame({
+    'MATCHUP': ['LAL @ BOS', 'BOS @ LAL', 'GSW vs. LAC', 'LAC vs. GSW', None, '', 'LAL at BOS'],
+    'TEAM_ABBREVIATION': ['LAL', 'BOS', 'LAC', 'LAC', 'MIA', 'MIA', 'LAL'],
+})
+EXPECTED_OPPONENTS = ['BOS', 'LAL', 'GSW', 'GSW', 'UNK', 'UNK', 'BOS']
+
+
+@pytest.mark.parametrize('use_polars', [True, False])
+def test_extract_opponents(monkeypatch, use_polars):
+    if use_polars and not nba_common.POLARS_AVAILABLE:
+        pytest.skip('polars not installed')
+    monkeypatch.setattr(nba_common, 'POLARS_AVAILABLE', use_polars)
+
+    assert list(nba_common.extract_opponents_vectorized(MATCHUPS)) == EXPECTED_OPPONENTS
+
+
+def test_extract_opponents_polars_matches_pandas(monkeypatch):
+    if not nba_common.POLARS_AVAILABLE:
+        pytest.skip('polars not installed')
+    api_log = _api_log(0, 200)
+    api_log['MATCHUP'] = api_log['MATCHUP'].where(api_log.index % 2 == 0, api_log['MATCHUP'].str.replace(' @ ', ' vs. '))
+    matchups = pd.concat([MATCHUPS, api_log[list(MATCHUPS.columns)]], ignore_index=True)
+
+    with_polars = nba_common.extract_opponents_vectorized(matchups)
+    monkeypatch.setattr(nba_common, 'POLARS_AVAILABLE', False)
+    without_polars = nba_common.extract_opponents_vectorized(matchups)
+
+    assert list(with_polars) == list(without_polars)
+
+
+def test_convert_minutes():
+    minutes = pd.Series(['34:30', '12:05', '12', None, ''])
+
+    assert list(nba_common.convert_minutes_vectorized(minutes)) == [34.5, 12.08, 12.0, 0.0, 0.0]
+
+
+def test_convert_minutes_numeric():
+    minutes = pd.Series([34.5, 12.0, None])
+
+    assert list(nba_common.convert_minutes_vectorized(minutes)) == [34.5, 12.0, 0.0]